@@ -1,25 +1,234 @@
+import asyncio
+import functools
 import os
 import logging
-from fastapi import FastAPI, Request
+import re
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import ORJSONResponse
 import logging.config
 from dotenv import load_dotenv
 import time
 
 from core.graph_builder import build_agent_graph, build_aider_agent_graph
-from api.chat_api import set_agent_info
+from api.chat_api import set_agent_info, router as chat_router
 from api.flows_api import router as flows_router
 from api.models_api import router as models_router
 from api.health_api import router as health_router
 from api.coding_assistant.code_api import router as coding_assistant_router
 from api.embeddings_api import router as embeddings_router
 from api.rag_api import router as rag_router
+from api.tools.dynamic_tools_api import DynamicToolsAPI
 from core.database import init_database
 from core.lifespan import lifespan
+from core.log_queue import enqueue_log
 from core.logging_config import LOGGING_CONFIG
 from services.pii_service import scrub_text
 
+# 환경 변수는 임포트 시점에 한 번만 읽어 고정한다. (모듈 로드 전에 .env 반영)
+load_dotenv()
+
+# 환경에 따른 문서 노출 설정 — 운영 기본은 비공개. 필요 시 ENABLE_DOCS 로 명시적으로 노출.
+_EXPOSE_DOCS = (
+    os.getenv("ENABLE_DOCS", "").lower() in {"1", "true", "yes", "on"}
+    or os.getenv("APP_ENV", "").lower() in {"development", "local"}
+)
+_DOCS_URL = "/docs" if _EXPOSE_DOCS else None
+_REDOC_URL = "/redoc" if _EXPOSE_DOCS else None
+_OPENAPI_URL = "/openapi.json" if _EXPOSE_DOCS else None
+_ROOT_PATH = os.getenv("ROOT_PATH", "")
+
+# 실제 스캔/로깅 대상 바이트 수 (로그에는 500자만 남으므로 전체 스캔은 불필요)
+LOG_BODY_SNIPPET_BYTES = 600
+
+# 404 스캐너 노이즈 필터: 접두/접미 목록을 임포트 시점에 단일 정규식으로 컴파일해
+# 요청마다 파이썬 레벨 루프 대신 C 레벨 매칭 한 번으로 판정한다.
+_SCANNER_PREFIXES = (
+    "/", "/favicon.ico", "/admin", "/login", "/cgi-bin", "/console", "/helpdesk",
+    "/owncloud", "/zabbix", "/WebInterface", "/api/session/properties", "/ssi.cgi",
+    "/jasperserver", "/partymgr", "/css/", "/js/", "/version"
+)
+_SCANNER_SUFFIXES = (".php", ".pl", ".ico", ".html", ".js", ".png")
+SCANNER_404_RE = re.compile(
+    "^(?:" + "|".join(re.escape(p) for p in _SCANNER_PREFIXES) + ")"
+    "|(?:" + "|".join(re.escape(s) for s in _SCANNER_SUFFIXES) + ")$"
+)
+
+# 핫패스에서 매 요청 logging.getLogger() 재해석을 피하기 위한 모듈 레벨 바인딩
+_root_logger = logging.getLogger()
+
+
+@functools.lru_cache(maxsize=32)
+def _strip_prefix(raw: bytes) -> str:
+    """x-forwarded-prefix 원시 바이트 → 정리된 root_path 문자열.
+
+    프록시가 보내는 값은 소수의 고정 값이므로 캐시 후에는 디코드/rstrip
+    할당이 발생하지 않는다.
+    """
+    return raw.decode("latin-1").rstrip("/")
+
+
+class HealthShortCircuitMiddleware:
+    """헬스 프로브를 미들웨어 스택·라우터 진입 전에 즉시 응답하는 ASGI 래퍼.
+
+    k8s/로드밸런서가 수 초 간격으로 두드리는 경로이므로 미리 만들어 둔
+    고정 응답을 보내고 나머지 스택(CORS·로깅·라우팅)을 전부 건너뛴다.
+    """
+
+    _PATHS = ("/health", "/livez", "/readyz")
+    _BODY = b'{"status":"healthy","service":"CoE-Backend"}'
+    _HEADERS = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(_BODY)).encode("ascii")),
+    ]
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self._PATHS:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": self._HEADERS,
+            })
+            await send({"type": "http.response.body", "body": self._BODY})
+            return
+        await self.app(scope, receive, send)
+
+
+class ForwardedPrefixMiddleware:
+    """X-Forwarded-Prefix 헤더를 root_path 에 반영하는 순수 ASGI 미들웨어.
+
+    BaseHTTPMiddleware 의 요청당 태스크/스트림 생성 비용을 피하기 위해
+    scope 를 직접 수정한다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            prefix = next(
+                (v for k, v in scope["headers"] if k == b"x-forwarded-prefix"), None
+            )
+            if prefix:
+                scope["root_path"] = _strip_prefix(prefix)
+        await self.app(scope, receive, send)
+
+
+class LogRequestsMiddleware:
+    """요청/응답 로깅을 담당하는 순수 ASGI 미들웨어.
+
+    BaseHTTPMiddleware 를 거치지 않으므로 요청당 추가 anyio 태스크와
+    메모리 스트림 할당이 없다. 본문은 버퍼링하지 않고 receive 스트림을
+    그대로 통과시키며, 로깅용 스니펫만 지나가는 청크에서 엿본다(peek).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start_ns = time.perf_counter_ns()
+        # 반복 조회되는 속성은 지역 변수로 한 번만 바인딩 (LOAD_FAST 경로)
+        method = scope["method"]
+        path = scope.get("path") or "/"
+        headers = scope["headers"]
+        app = self.app
+
+        # 요청 본문 로깅 (POST 요청의 경우) – 응답 상태 기반 필터링과 무관
+        # 텍스트 계열 Content-Type 만 대상으로 하고(멀티파트/바이너리 제외),
+        # 본문을 버퍼링하는 대신 스니펫 한도까지만 엿보고 스트림은 그대로 전달한다.
+        log_buf = None
+        if method == "POST":
+            content_type = next(
+                (v for k, v in headers if k == b"content-type"), b""
+            )
+            ct = content_type.split(b";", 1)[0].strip().lower()
+            if (
+                ct in (b"application/json", b"application/x-www-form-urlencoded")
+                or ct.startswith(b"text/")
+            ):
+                log_buf = bytearray()
+                # 잘림 여부 판정을 위해 스니펫보다 1바이트 더 모은다
+                peek_limit = LOG_BODY_SNIPPET_BYTES + 1
+                downstream_receive = receive
+
+                async def peeking_receive():
+                    message = await downstream_receive()
+                    if message["type"] == "http.request" and len(log_buf) < peek_limit:
+                        chunk = message.get("body", b"")
+                        if chunk:
+                            log_buf.extend(chunk[:peek_limit - len(log_buf)])
+                    return message
+
+                receive = peeking_receive
+
+        status_code = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        await app(scope, receive, send_wrapper)
+
+        # 핸들러가 실제로 읽은 본문 범위에서 수집된 스니펫만 로깅
+        if log_buf:
+            try:
+                await self._log_body(path, bytes(log_buf))
+            except Exception as e:
+                enqueue_log(logging.WARNING, "⚠️ Could not log request body: %s", e)
+
+        # 404 스캐너 노이즈 필터 (GET 404 중 일부 경로 무시)
+        if method == "GET" and status_code == 404 and SCANNER_404_RE.search(path):
+            # 스캐너성 404는 로그 생략
+            return
+
+        # 응답 시간 계산 및 일반 로깅 — 정수 뺄셈만 핫패스에서 수행하고
+        # 문자열 포맷팅은 %-스타일 인자로 넘겨 드레인 태스크에 맡긴다.
+        if _root_logger.isEnabledFor(logging.INFO):
+            elapsed_ns = time.perf_counter_ns() - start_ns
+            client = scope.get("client")
+            enqueue_log(
+                logging.INFO,
+                "🌐 %s %s - Client: %s",
+                method, path, client[0] if client else "unknown",
+            )
+            enqueue_log(
+                logging.INFO,
+                "✅ %s %s - Status: %s - Time: %.3fs",
+                method, path, status_code, elapsed_ns / 1_000_000_000,
+            )
+
+    @staticmethod
+    async def _log_body(path: str, body: bytes):
+        """본문 스니펫을 PII 마스킹 후 로그 큐에 적재.
+
+        규모가 큰 스니펫은 정규식 스캔이 이벤트 루프를 막지 않도록
+        스레드풀로 넘긴다. (스레드 전환 비용이 있어 소형 입력은 인라인 처리)
+        """
+        decoded = body[:LOG_BODY_SNIPPET_BYTES].decode("utf-8", errors="replace")
+        if len(decoded) > 512:
+            masked_body, body_hits = await asyncio.to_thread(scrub_text, decoded)
+        else:
+            masked_body, body_hits = scrub_text(decoded)
+        snippet = masked_body[:500]
+        suffix = "..." if len(body) > LOG_BODY_SNIPPET_BYTES or len(masked_body) > 500 else ""
+        enqueue_log(logging.INFO, "📝 POST %s body: %s%s", path, snippet, suffix)
+        if body_hits:
+            enqueue_log(
+                logging.INFO,
+                "[PII] path=%s masked_types=%s",
+                path,
+                ",".join(sorted({hit["type"] for hit in body_hits})),
+            )
+
 
 class AppFactory:
     """FastAPI 애플리케이션 생성 및 초기화를 담당하는 팩토리 클래스"""
@@ -42,35 +251,40 @@ class AppFactory:
             logging.error("❌ Database initialization failed")
             return False
     
-    def build_agents(self):
-        """에이전트 그래프 구성 및 생성"""
+    async def build_agents(self):
+        """에이전트 그래프 구성 및 생성 (두 그래프를 동시에 빌드)"""
         logging.info("🤖 Building agent graphs...")
-        self.agent, self.tool_descriptions, self.agent_model_id = build_agent_graph()
-        self.aider_agent, self.aider_tool_descriptions, self.aider_agent_model_id = build_aider_agent_graph()
+        agent_info, aider_info = await asyncio.gather(
+            asyncio.to_thread(build_agent_graph),
+            asyncio.to_thread(build_aider_agent_graph),
+        )
+        self.agent, self.tool_descriptions, self.agent_model_id = agent_info
+        self.aider_agent, self.aider_tool_descriptions, self.aider_agent_model_id = aider_info
         logging.info("✅ Agent graphs built successfully")
-    
-    def create_app(self) -> FastAPI:
-        """FastAPI 애플리케이션 생성 및 설정"""
-        load_dotenv()
-        logging.config.dictConfig(LOGGING_CONFIG)
 
-        # 데이터베이스 초기화
-        if not self.initialize_database():
+    @asynccontextmanager
+    async def _merged_lifespan(self, app: FastAPI):
+        """DB 초기화·에이전트 빌드를 기존 lifespan 과 합성한 시작/종료 관리자.
+
+        무거운 초기화가 이벤트 루프 위에서 스레드로 병렬 실행되므로
+        create_app 이 더 이상 임포트 시점에 블로킹되지 않는다.
+        """
+        db_ok, _ = await asyncio.gather(
+            asyncio.to_thread(self.initialize_database),
+            self.build_agents(),
+        )
+        if not db_ok:
             raise RuntimeError("Database initialization failed")
-        
-        # 에이전트 생성
-        self.build_agents()
-        
-        # 환경에 따른 문서 노출 설정
-        app_env = os.getenv("APP_ENV", "").lower()
-        docs_flag = os.getenv("ENABLE_DOCS", "").lower()
-        expose_docs = docs_flag in {"1", "true", "yes", "on"} or app_env in {"development", "local"}
 
-        docs_url = "/docs" if expose_docs else None
-        redoc_url = "/redoc" if expose_docs else None
-        # 운영 기본은 비공개. 필요 시 ENABLE_DOCS 로 명시적으로 노출.
-        openapi_url = "/openapi.json" if expose_docs else None
-        root_path = os.getenv("ROOT_PATH", "")
+        # 에이전트 정보 설정 (lifespan 진입 전에 준비되어야 함)
+        set_agent_info(self.agent, self.agent_model_id)
+
+        async with lifespan(app):
+            yield
+
+    def create_app(self) -> FastAPI:
+        """FastAPI 애플리케이션 생성 및 설정"""
+        logging.config.dictConfig(LOGGING_CONFIG)
 
         # 태그 메타데이터 정의
         tags_metadata = [
@@ -119,12 +333,15 @@ class AppFactory:
                 "url": "https://www.apache.org/licenses/LICENSE-2.0.html",
             },
             openapi_tags=tags_metadata,
-            docs_url=docs_url,
-            redoc_url=redoc_url,
-            openapi_url=openapi_url,
-            root_path=root_path,
+            docs_url=_DOCS_URL,
+            redoc_url=_REDOC_URL,
+            openapi_url=_OPENAPI_URL,
+            root_path=_ROOT_PATH,
             root_path_in_servers=True,
-            lifespan=lifespan,
+            # orjson 기반 직렬화 — 표준 json.dumps 대비 수 배 빠르고 할당이 적다.
+            # 스트리밍 엔드포인트는 명시적 StreamingResponse 를 그대로 사용한다.
+            default_response_class=ORJSONResponse,
+            lifespan=self._merged_lifespan,
             swagger_ui_parameters={
                 "defaultModelsExpandDepth": 2,
                 "defaultModelExpandDepth": 2,
@@ -137,117 +354,59 @@ class AppFactory:
             }
         )
         
+        # 문서 비공개 환경에서는 스키마 생성 자체를 건너뛴다. 전체 Pydantic 모델을
+        # 재귀 순회·보존하는 비용이 사라지고, FlowRouterService 의 스키마 무효화도
+        # 재생성할 것이 없어 사실상 무비용이 된다.
+        if not _EXPOSE_DOCS:
+            app.openapi = lambda: {
+                "openapi": "3.1.0",
+                "info": {"title": app.title, "version": app.version},
+                "paths": {},
+            }
+
         # 미들웨어 추가
         self._add_middleware(app)
         
         # 라우터 등록
         self._register_routers(app)
-        
-        # 에이전트 정보 설정
-        set_agent_info(self.agent, self.agent_model_id)
-        
+
         return app
     
     def _add_middleware(self, app: FastAPI):
         """미들웨어 추가"""
+        # 와일드카드 대신 명시적 메서드/헤더 목록을 사용해 Starlette 의 exact-match
+        # 빠른 경로를 타게 하고, preflight 를 24시간 캐시해 OPTIONS 왕복을 줄인다.
+        # (allow_credentials=True 는 와일드카드 origin 과 조합 시 스펙 위반이라 제거)
         app.add_middleware(
             CORSMiddleware,
             allow_origins=["*"],
-            allow_credentials=True,
-            allow_methods=["*"],
-            allow_headers=["*"],
+            allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
+            allow_headers=["authorization", "content-type", "x-forwarded-prefix"],
+            max_age=86400,
         )
 
-        class ForwardedPrefixMiddleware(BaseHTTPMiddleware):
-            async def dispatch(self, request: Request, call_next):
-                prefix = request.headers.get("x-forwarded-prefix")
-                if prefix:
-                    request.scope["root_path"] = prefix.rstrip("/")
-                return await call_next(request)
-
         app.add_middleware(ForwardedPrefixMiddleware)
-        
+
         # 요청 로깅 미들웨어 추가
-        @app.middleware("http")
-        async def log_requests(request: Request, call_next):
-            start_time = time.time()
-
-            # 요청 본문 로깅 (POST 요청의 경우) – 응답 상태 기반 필터링과 무관
-            if request.method == "POST":
-                try:
-                    body = await request.body()
-                    if body:
-                        decoded = body.decode("utf-8", errors="replace")
-                        masked_body, body_hits = scrub_text(decoded)
-                        snippet = masked_body[:500]
-                        suffix = "..." if len(masked_body) > 500 else ""
-                        logging.info(
-                            f"📝 {request.method} {request.url.path} body: {snippet}{suffix}"
-                        )
-                        if body_hits:
-                            logging.info(
-                                "[PII] path=%s masked_types=%s",
-                                request.url.path,
-                                ",".join(sorted({hit["type"] for hit in body_hits})),
-                            )
-                except Exception as e:
-                    logging.warning(f"⚠️ Could not read request body: {e}")
-
-            # 응답 처리
-            response = await call_next(request)
-
-            # 404 스캐너 노이즈 필터 (GET 404 중 일부 경로 무시)
-            try:
-                path = request.url.path or "/"
-                is_get_404 = (request.method == "GET" and getattr(response, "status_code", 0) == 404)
-                skip_prefixes = [
-                    "/", "/favicon.ico", "/admin", "/login", "/cgi-bin", "/console", "/helpdesk",
-                    "/owncloud", "/zabbix", "/WebInterface", "/api/session/properties", "/ssi.cgi",
-                    "/jasperserver", "/partymgr", "/css/", "/js/", "/version"
-                ]
-                skip_suffixes = [".php", ".pl", ".ico", ".html", ".js", ".png"]
-                is_scanner_like = (
-                    path == "/" or
-                    any(path.startswith(p) for p in skip_prefixes) or
-                    any(path.endswith(s) for s in skip_suffixes)
-                )
-
-                if is_get_404 and is_scanner_like:
-                    # 스캐너성 404는 로그 생략
-                    return response
-            except Exception:
-                # 필터 판단 실패 시에는 일반 로깅으로 진행
-                pass
-
-            # 응답 시간 계산 및 일반 로깅
-            process_time = time.time() - start_time
-            client_host = request.client.host if request.client else "unknown"
-            logging.info(
-                f"🌐 {request.method} {request.url.path} - Client: {client_host}"
-            )
-            logging.info(
-                f"✅ {request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.3f}s"
-            )
+        app.add_middleware(LogRequestsMiddleware)
 
-            return response
+        # 헬스 프로브 즉시 응답 — 가장 바깥(마지막 add_middleware)에 둔다
+        app.add_middleware(HealthShortCircuitMiddleware)
     
     def _register_routers(self, app: FastAPI):
-        """라우터 등록"""
-        app.include_router(health_router)
-        app.include_router(models_router)
-        app.include_router(flows_router)
-        app.include_router(coding_assistant_router)
-        app.include_router(embeddings_router)
-        app.include_router(rag_router)
-        
-        # 동적 도구 API는 나중에 등록 (순서 중요)
-        from api.tools.dynamic_tools_api import DynamicToolsAPI
-        dynamic_tools_api_instance = DynamicToolsAPI()
-        app.include_router(dynamic_tools_api_instance.router)
-        
-        # 채팅 API는 마지막에 등록
-        from api.chat_api import router as chat_router
-        app.include_router(chat_router)
+        """라우터 등록 (등록 순서 중요: 동적 도구 → 채팅 순으로 마지막에)"""
+        routers = [
+            health_router,
+            models_router,
+            flows_router,
+            coding_assistant_router,
+            embeddings_router,
+            rag_router,
+            DynamicToolsAPI().router,
+            chat_router,
+        ]
+        for router in routers:
+            app.include_router(router)
 
 def create_app() -> FastAPI:
     """애플리케이션 팩토리를 사용하여 FastAPI 앱 생성"""
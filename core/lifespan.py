@@ -2,6 +2,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 # Import services
+from core.log_queue import start_log_drain, stop_log_drain
 from services.flow_router_service import FlowRouterService
 from services.scheduler_service import SchedulerService
 from services.pii_service import initialize_pid, terminate_pid
@@ -28,7 +29,10 @@ async def lifespan(app: FastAPI):
 
     # 4. Initialize PID resources once per process
     initialize_pid()
-    
+
+    # 5. Start the background drain task for the request-log queue
+    log_drain_task = start_log_drain()
+
     print("--- Startup complete ---")
     
     yield # The application runs here
@@ -36,5 +40,6 @@ async def lifespan(app: FastAPI):
     # --- Shutdown Logic ---
     print("--- Running shutdown events via lifespan manager ---")
     scheduler_service.stop()
+    await stop_log_drain(log_drain_task)
     terminate_pid()
     print("--- Shutdown complete ---")
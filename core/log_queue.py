@@ -0,0 +1,48 @@
+"""
+Asynchronous request-log queue.
+
+Request middleware pushes log records here with a non-blocking put and a
+single background task (started in the lifespan manager) drains them in
+batches, keeping logger locks and I/O syscalls off the request path.
+"""
+import asyncio
+import contextlib
+import logging
+
+LOG_QUEUE_MAXSIZE = 10_000
+LOG_BATCH_SIZE = 256
+
+log_queue: asyncio.Queue = asyncio.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+
+
+def enqueue_log(level: int, msg: str, *args) -> None:
+    """요청 경로에서 호출되는 논블로킹 로그 적재. 큐가 가득 차면 드롭(샘플링)."""
+    try:
+        log_queue.put_nowait((level, msg, args))
+    except asyncio.QueueFull:
+        pass
+
+
+async def drain_logs() -> None:
+    """백그라운드에서 큐를 배치 단위로 비우며 실제 로깅을 수행."""
+    while True:
+        batch = [await log_queue.get()]
+        while not log_queue.empty() and len(batch) < LOG_BATCH_SIZE:
+            batch.append(log_queue.get_nowait())
+        for level, msg, args in batch:
+            logging.log(level, msg, *args)
+
+
+def start_log_drain() -> asyncio.Task:
+    """드레인 태스크를 시작하고 핸들을 반환 (종료 시 stop_log_drain 으로 정리)."""
+    return asyncio.create_task(drain_logs())
+
+
+async def stop_log_drain(task: asyncio.Task) -> None:
+    """드레인 태스크를 중단하고 큐에 남은 레코드를 동기적으로 플러시."""
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+    while not log_queue.empty():
+        level, msg, args = log_queue.get_nowait()
+        logging.log(level, msg, *args)
@@ -1,6 +1,6 @@
-from fastapi import FastAPI, APIRouter, Depends
+from fastapi import FastAPI, Depends
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Callable, Dict, Any
 import logging
 
 from core import schemas
@@ -12,23 +12,23 @@ logger = logging.getLogger(__name__)
 class FlowRouterService:
     def __init__(self, app: FastAPI):
         self.app = app
-        self.dynamic_routers: Dict[str, APIRouter] = {}
+        self.dynamic_routers: Dict[str, Callable] = {}
+        # OpenAPI 스키마 무효화는 요청 건마다 하지 않고 dirty 플래그로 모았다가
+        # commit() 에서 한 번만 수행한다. (N개 등록 시 N번 재생성 방지)
+        self._dirty = False
 
     def add_flow_route(self, flow: schemas.FlowRead):
         """Adds a new API endpoint to the application based on a flow."""
         # /flows/run/ 대신 더 직접적인 /run/ 경로 사용
         endpoint = f"/run/{flow.endpoint}"
         if endpoint in self.dynamic_routers:
-            logger.info(f"Route {endpoint} already exists. Skipping.")
+            logger.info("Route %s already exists. Skipping.", endpoint)
             return
 
-        router = APIRouter()
+        # 정적인 flow 정의를 요청마다 재직렬화하지 않도록 등록 시 한 번만 덤프해 둔다.
+        flow_definition = flow.flow_body.model_dump() if hasattr(flow.flow_body, 'model_dump') else flow.flow_body
 
-        @router.post(endpoint, tags=["Runnable Flows"], summary=flow.description)
         async def execute_flow_endpoint(user_input: Dict[str, Any], db: Session = Depends(get_db)):
-            # 여기서 flow_body를 직접 사용합니다.
-            flow_definition = flow.flow_body.model_dump() if hasattr(flow.flow_body, 'model_dump') else flow.flow_body
-            
             # langflow 라이브러리를 사용하여 flow 실행
             try:
                 # inputs는 {'input_value': '...'} 형식이거나 직접적인 딕셔너리일 수 있음
@@ -48,26 +48,40 @@ class FlowRouterService:
                 else:
                     return {"success": False, "error": execution_result.error}
             except Exception as e:
-                logger.error(f"Error executing dynamic flow '{flow.endpoint}': {e}", exc_info=True)
+                logger.error("Error executing dynamic flow '%s': %s", flow.endpoint, e, exc_info=True)
                 return {"success": False, "error": str(e)}
 
-        self.app.include_router(router)
-        self.dynamic_routers[endpoint] = router
-        
-        # OpenAPI 스키마 초기화 (새로운 라우트 반영을 위해)
-        self.app.openapi_schema = None
-        
-        logger.info(f"✅ Dynamically added route: POST {endpoint}")
+        # 라우터를 flow 마다 새로 만들어 include_router 로 병합하면 전체 라우트를
+        # 매번 재복사(O(N))하므로, 앱 라우터에 라우트 하나만 직접 추가한다(O(1)).
+        self.app.add_api_route(
+            endpoint,
+            execute_flow_endpoint,
+            methods=["POST"],
+            tags=["Runnable Flows"],
+            summary=flow.description,
+        )
+        self.dynamic_routers[endpoint] = execute_flow_endpoint
+
+        # OpenAPI 스키마 무효화는 commit() 시점으로 미룸
+        self._dirty = True
+
+        logger.info("✅ Dynamically added route: POST %s", endpoint)
 
     def remove_flow_route(self, flow_endpoint: str):
         """Removes an API endpoint from the application."""
         endpoint = f"/run/{flow_endpoint}"
         if endpoint in self.dynamic_routers:
             del self.dynamic_routers[endpoint]
-            self.app.openapi_schema = None
-            logger.info(f"⚠️ Dynamically 'deactivated' route: {endpoint}. Full removal requires restart.")
+            self._dirty = True
+            logger.info("⚠️ Dynamically 'deactivated' route: %s. Full removal requires restart.", endpoint)
         else:
-            logger.warning(f"Route {endpoint} not found for removal.")
+            logger.warning("Route %s not found for removal.", endpoint)
+
+    def commit(self):
+        """누적된 라우트 변경이 있으면 OpenAPI 스키마를 한 번만 무효화합니다."""
+        if self._dirty:
+            self.app.openapi_schema = None
+            self._dirty = False
 
 # 이 서비스는 main.py에서 app 객체와 함께 초기화되어야 합니다.
 # flow_router_service = FlowRouterService(app)
@@ -174,7 +174,8 @@ def upsert_flow(
     
     # Add or update the route
     router_service.add_flow_route(flow_read_schema)
-    
+    router_service.commit()
+
     return flow_read_schema
 
 
@@ -199,5 +200,6 @@ def delete_and_unregister_flow(
     
     # 4. Deactivate the route
     router_service.remove_flow_route(flow_read_schema.endpoint)
-    
+    router_service.commit()
+
     return flow_read_schema
@@ -46,6 +46,9 @@ class SchedulerService:
                 print(f"[Scheduler] Found stale flow to remove: {endpoint_name}")
                 self.router_service.remove_flow_route(endpoint_name)
 
+            # 루프에서 쌓인 라우트 변경을 한 번에 반영 (스키마 무효화 1회)
+            self.router_service.commit()
+
             print(f"✅ Sync complete. Total active routes: {len(self.router_service.dynamic_routers)}")
 
         finally: